@@ -2,7 +2,9 @@ import argparse
 import asyncio
 
 from crawl import crawl
+from daemon import PollingDaemon
 from env import ACCESS_TOKEN
+from features.sinks import SinkError, SQLiteSink
 
 
 def main():
@@ -15,12 +17,69 @@ def main():
     parser.add_argument("--limit", type=int, default=10)
     parser.add_argument("--output", dest="output_filename")
     parser.add_argument("--tab", choices=["TOP", "LATEST"], default="TOP")
+    parser.add_argument("--download-media", action="store_true", dest="download_media")
+    parser.add_argument("--media-dir", dest="media_dir")
+    parser.add_argument("--lang", help="Only keep tweets in this language")
+    parser.add_argument("--min-faves", type=int, dest="min_faves")
+    parser.add_argument("--min-retweets", type=int, dest="min_retweets")
+    parser.add_argument("--min-replies", type=int, dest="min_replies")
+    parser.add_argument("--originals-only", action="store_true", dest="originals_only")
+    parser.add_argument("--has-media", action="store_true", dest="has_media")
+    parser.add_argument("--sqlite", dest="sqlite_path", help="Upsert tweets into this SQLite database")
+    parser.add_argument("--table", default="tweets", help="Table used with --sqlite")
+    parser.add_argument(
+        "--daemon",
+        nargs="+",
+        metavar="KEYWORD",
+        help="Keep polling these keywords, scheduled by tweet velocity",
+    )
+    parser.add_argument(
+        "--requests-per-hour",
+        type=int,
+        dest="requests_per_hour",
+        help="Daemon budget of timeline requests per hour across all keywords",
+    )
     args = parser.parse_args()
 
     token = args.token or ACCESS_TOKEN
     if not token:
         parser.error("Twitter token is required")
 
+    filters = {
+        key: getattr(args, key)
+        for key in ("lang", "min_faves", "min_retweets", "min_replies", "originals_only", "has_media")
+        if getattr(args, key)
+    }
+
+    try:
+        sink = SQLiteSink(args.sqlite_path, table=args.table) if args.sqlite_path else None
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        run(args, token, filters, sink)
+    except SinkError as e:
+        parser.exit(1, f"{e}\n")
+    finally:
+        if sink:
+            sink.close()
+
+
+def run(args, token, filters, sink):
+    if args.daemon:
+        daemon = PollingDaemon(
+            access_token=token,
+            keywords=args.daemon,
+            batch_size=args.limit,
+            requests_per_hour=args.requests_per_hour,
+            filters=filters,
+            sink=sink,
+            download_media=args.download_media,
+            media_dir=args.media_dir,
+        )
+        asyncio.run(daemon.run())
+        return
+
     asyncio.run(
         crawl(
             access_token=token,
@@ -31,6 +90,10 @@ def main():
             target_tweet_count=args.limit,
             output_filename=args.output_filename,
             search_tab=args.tab,
+            download_media=args.download_media,
+            media_dir=args.media_dir,
+            filters=filters,
+            sink=sink,
         )
     )
 
@@ -7,6 +7,7 @@ from datetime import datetime
 NOW = datetime.now().strftime("%d-%m-%Y %H-%M-%S")
 
 FOLDER_DESTINATION = "./tweets-data"
+MEDIA_DESTINATION = "./tweets-data/media"
 
 FILTERED_FIELDS = [
     "created_at",
@@ -25,3 +26,9 @@ FILTERED_FIELDS = [
     "location",
     "in_reply_to_screen_name",
 ]
+
+TIMELINE_PAGE_SIZE = 20
+
+POLL_MIN_INTERVAL_SECONDS = 60
+POLL_MAX_INTERVAL_SECONDS = 60 * 60
+POLL_RATE_SMOOTHING = 0.5
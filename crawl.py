@@ -11,12 +11,16 @@ from constants import (
     NOW,
     FOLDER_DESTINATION,
     FILTERED_FIELDS,
+    MEDIA_DESTINATION,
 )
 from env import HEADLESS_MODE
 from features.input_keywords import input_keywords
 from features.listen_network_requests import listen_network_requests
 from helpers.page_helper import scroll_down, scroll_up_step
 from features.exponential_backoff import calculate_for_rate_limit
+from features.media_downloader import MediaDownloader
+from features.tweet_filters import FilterError, compile_filters
+from features.sinks import SinkError, TweetSink, write_with_retry
 import re
 
 # --- PATCH: Helper tunggu response via event ---
@@ -53,10 +57,22 @@ async def crawl(
     output_filename: str = None,
     search_tab: str = "TOP",
     csv_insert_mode: str = "REPLACE",
+    download_media: bool = False,
+    media_dir: str = None,
+    filters: dict = None,
+    sink: TweetSink = None,
+    stop_when_exhausted: bool = False,
+    stop_at_id: int = None,
+    stats: dict = None,
 ):
     crawl_mode = "DETAIL" if tweet_thread_url else "SEARCH"
     is_detail_mode = crawl_mode == "DETAIL"
     is_search_mode = crawl_mode == "SEARCH"
+    matches = compile_filters(filters)
+    # Filled in for the caller: timeline responses read and whether the
+    # timeline ran out before the target count was reached.
+    stats = stats if stats is not None else {}
+    stats.update(responses=0, exhausted=False)
 
     filename = (output_filename or f"{search_keywords} {NOW}").strip().replace(".csv", "")
     file_path = Path(FOLDER_DESTINATION) / f"{filename}.csv"
@@ -87,6 +103,14 @@ async def crawl(
         )
         page = await context.new_page()
         page.set_default_timeout(60 * 1000)
+
+        media_downloader = None
+        if download_media:
+            # Separate request context: not subject to the page's media blocking.
+            media_downloader = MediaDownloader(
+                await p.request.new_context(), media_dir or MEDIA_DESTINATION
+            )
+            media_downloader.start()
         timeline_data = []
 
         async def on_timeline(data):
@@ -116,15 +140,18 @@ async def crawl(
                     search_keywords=search_keywords,
                     from_date=search_from_date,
                     to_date=search_to_date,
+                    filters=filters,
                 )
 
             timeout_count = 0
             additional_tweets = 0
             rate_limit_count = 0
             last_len = 0
+            sink_error = None
+            seen_entry_ids = set()
 
             async def scroll_and_save():
-                nonlocal timeout_count, additional_tweets, rate_limit_count, last_len
+                nonlocal timeout_count, additional_tweets, rate_limit_count, last_len, sink_error
                 logger.info("Start crawling and scrolling.")
                 while len(tweets) < target_tweet_count and timeout_count < 20:
                     if page.is_closed():
@@ -170,6 +197,10 @@ async def crawl(
                             break
 
                         rate_limit_count = 0
+                        stats["responses"] += 1
+                        page_rows = []
+                        new_entries = 0
+                        boundary_reached = False
                         entries = []
                         if data.get("data", {}).get("threaded_conversation_with_injections_v2"):
                             entries = (
@@ -185,6 +216,15 @@ async def crawl(
                                 .get("entries", [])
                             )
                         for entry in entries:
+                            entry_id = entry.get("entryId", "")
+                            if entry_id.startswith("tweet-"):
+                                tweet_id = entry_id[len("tweet-"):]
+                                if stop_at_id is not None and tweet_id.isdigit() and int(tweet_id) <= stop_at_id:
+                                    boundary_reached = True
+                                    continue
+                                if entry_id not in seen_entry_ids:
+                                    seen_entry_ids.add(entry_id)
+                                    new_entries += 1
                             content = entry.get("content", {})
                             if is_search_mode:
                                 item = (
@@ -212,6 +252,10 @@ async def crawl(
                             user_core = result.get("core").get("user_results", {}).get("result", {}).get("core", {})
                             if not legacy or not user_legacy:
                                 continue
+                            # Drop non-matching tweets before building the row so
+                            # the limit only counts tweets we actually want.
+                            if matches and not matches(legacy):
+                                continue
                             row = {
                                 **{k: legacy.get(k, "") for k in FILTERED_FIELDS if k in legacy},
                                 "username": user_core.get("screen_name", None),
@@ -221,6 +265,9 @@ async def crawl(
                                 "in_reply_to_screen_name": legacy.get("in_reply_to_screen_name", ""),
                             }
                             tweets.append(row)
+                            page_rows.append(row)
+                            if media_downloader:
+                                media_downloader.submit(legacy.get("id_str"), legacy)
                             additional_tweets += 1
                             # Logging progress every 10 tweets
                             if len(tweets) % 10 == 0 and len(tweets) != last_len:
@@ -229,6 +276,19 @@ async def crawl(
                             if len(tweets) >= target_tweet_count:
                                 logger.info("Target tweet count reached (%d)", len(tweets))
                                 break
+                        if sink and page_rows:
+                            try:
+                                await write_with_retry(sink, page_rows)
+                            except SinkError as e:
+                                logger.error(str(e))
+                                sink_error = e
+                                break
+                        if stop_when_exhausted and (boundary_reached or not new_entries):
+                            # Judged from the raw entries: a page of filtered or
+                            # unparsable tweets still means more may follow.
+                            stats["exhausted"] = True
+                            logger.info("Timeline exhausted after %d responses, stopping.", stats["responses"])
+                            break
                         await scroll_up_step(page)
                         await scroll_down(page)
                         await asyncio.sleep(0.7)
@@ -237,6 +297,8 @@ async def crawl(
                             logger.info("Waiting %d seconds after crawling %d tweets.", delay_each_tweet_seconds, additional_tweets)
                             await page.wait_for_timeout(delay_each_tweet_seconds * 1000)
                             additional_tweets = 0
+                    except FilterError:
+                        raise
                     except Exception as e:
                         logger.error(f"Exception in scroll_and_save: {e}")
                         break
@@ -248,12 +310,23 @@ async def crawl(
                 logger.info("Saved %d tweets to %s", len(tweets), file_path)
             else:
                 logger.warning("No tweets crawled.")
+            # Rows are kept locally above; the caller still has to know the
+            # sink is missing them.
+            if sink_error:
+                raise sink_error
 
         try:
             await start_crawl()
+        except (SinkError, FilterError):
+            raise
         except Exception as e:
             logger.error(f"Error in start_crawl: {e}")
         finally:
+            if media_downloader:
+                try:
+                    await media_downloader.close()
+                except Exception as e:
+                    logger.error(f"Failed to finish media downloads: {e}")
             try:
                 await browser.close()
             except Exception:
@@ -275,11 +348,23 @@ async def crawl_buffer(
     debug_mode: bool = False,
     search_tab: str = "TOP",
     csv_insert_mode: str = "REPLACE",
+    download_media: bool = False,
+    media_dir: str = None,
+    filters: dict = None,
+    sink: TweetSink = None,
+    stop_when_exhausted: bool = False,
+    stop_at_id: int = None,
+    stats: dict = None,
 ) -> io.StringIO:
     """Crawl tweets but return the CSV data as an in-memory buffer."""
     crawl_mode = "DETAIL" if tweet_thread_url else "SEARCH"
     is_detail_mode = crawl_mode == "DETAIL"
     is_search_mode = crawl_mode == "SEARCH"
+    matches = compile_filters(filters)
+    # Filled in for the caller: timeline responses read and whether the
+    # timeline ran out before the target count was reached.
+    stats = stats if stats is not None else {}
+    stats.update(responses=0, exhausted=False)
 
     buffer = io.StringIO()
     tweets = []
@@ -306,6 +391,14 @@ async def crawl_buffer(
         )
         page = await context.new_page()
         page.set_default_timeout(60 * 1000)
+
+        media_downloader = None
+        if download_media:
+            # Separate request context: not subject to the page's media blocking.
+            media_downloader = MediaDownloader(
+                await p.request.new_context(), media_dir or MEDIA_DESTINATION
+            )
+            media_downloader.start()
         timeline_data = []
 
         async def on_timeline(data):
@@ -336,15 +429,18 @@ async def crawl_buffer(
                     search_keywords=search_keywords,
                     from_date=search_from_date,
                     to_date=search_to_date,
+                    filters=filters,
                 )
 
             timeout_count = 0
             additional_tweets = 0
             rate_limit_count = 0
             last_len = 0
+            sink_error = None
+            seen_entry_ids = set()
 
             async def scroll_and_save():
-                nonlocal timeout_count, additional_tweets, rate_limit_count, last_len
+                nonlocal timeout_count, additional_tweets, rate_limit_count, last_len, sink_error
                 logger.info("Start crawling and scrolling.")
                 while len(tweets) < target_tweet_count and timeout_count < 20:
                     if page.is_closed():
@@ -390,6 +486,10 @@ async def crawl_buffer(
                             break
 
                         rate_limit_count = 0
+                        stats["responses"] += 1
+                        page_rows = []
+                        new_entries = 0
+                        boundary_reached = False
                         entries = []
                         if data.get("data", {}).get("threaded_conversation_with_injections_v2"):
                             entries = (
@@ -405,6 +505,15 @@ async def crawl_buffer(
                                 .get("entries", [])
                             )
                         for entry in entries:
+                            entry_id = entry.get("entryId", "")
+                            if entry_id.startswith("tweet-"):
+                                tweet_id = entry_id[len("tweet-"):]
+                                if stop_at_id is not None and tweet_id.isdigit() and int(tweet_id) <= stop_at_id:
+                                    boundary_reached = True
+                                    continue
+                                if entry_id not in seen_entry_ids:
+                                    seen_entry_ids.add(entry_id)
+                                    new_entries += 1
                             content = entry.get("content", {})
                             if is_search_mode:
                                 item = (
@@ -432,6 +541,10 @@ async def crawl_buffer(
                             user_core = result.get("core").get("user_results", {}).get("result", {}).get("core", {})
                             if not legacy or not user_legacy:
                                 continue
+                            # Drop non-matching tweets before building the row so
+                            # the limit only counts tweets we actually want.
+                            if matches and not matches(legacy):
+                                continue
                             row = {
                                 **{k: legacy.get(k, "") for k in FILTERED_FIELDS if k in legacy},
                                 "username": user_core.get("screen_name", None),
@@ -441,6 +554,9 @@ async def crawl_buffer(
                                 "in_reply_to_screen_name": legacy.get("in_reply_to_screen_name", ""),
                             }
                             tweets.append(row)
+                            page_rows.append(row)
+                            if media_downloader:
+                                media_downloader.submit(legacy.get("id_str"), legacy)
                             additional_tweets += 1
                             # Logging progress every 10 tweets
                             if len(tweets) % 10 == 0 and len(tweets) != last_len:
@@ -449,6 +565,19 @@ async def crawl_buffer(
                             if len(tweets) >= target_tweet_count:
                                 logger.info("Target tweet count reached (%d)", len(tweets))
                                 break
+                        if sink and page_rows:
+                            try:
+                                await write_with_retry(sink, page_rows)
+                            except SinkError as e:
+                                logger.error(str(e))
+                                sink_error = e
+                                break
+                        if stop_when_exhausted and (boundary_reached or not new_entries):
+                            # Judged from the raw entries: a page of filtered or
+                            # unparsable tweets still means more may follow.
+                            stats["exhausted"] = True
+                            logger.info("Timeline exhausted after %d responses, stopping.", stats["responses"])
+                            break
                         await scroll_up_step(page)
                         await scroll_down(page)
                         await asyncio.sleep(0.7)
@@ -457,6 +586,8 @@ async def crawl_buffer(
                             logger.info("Waiting %d seconds after crawling %d tweets.", delay_each_tweet_seconds, additional_tweets)
                             await page.wait_for_timeout(delay_each_tweet_seconds * 1000)
                             additional_tweets = 0
+                    except FilterError:
+                        raise
                     except Exception as e:
                         logger.error(f"Exception in scroll_and_save: {e}")
                         break
@@ -469,12 +600,23 @@ async def crawl_buffer(
                 buffer.seek(0)
             else:
                 logger.warning("No tweets crawled.")
+            # Rows are kept locally above; the caller still has to know the
+            # sink is missing them.
+            if sink_error:
+                raise sink_error
 
         try:
             await start_crawl()
+        except (SinkError, FilterError):
+            raise
         except Exception as e:
             logger.error(f"Error in start_crawl: {e}")
         finally:
+            if media_downloader:
+                try:
+                    await media_downloader.close()
+                except Exception as e:
+                    logger.error(f"Failed to finish media downloads: {e}")
             try:
                 await browser.close()
             except Exception:
@@ -0,0 +1,279 @@
+import asyncio
+import csv
+import heapq
+import math
+import time
+from datetime import datetime
+from pathlib import Path
+
+from constants import (
+    FILTERED_FIELDS,
+    FOLDER_DESTINATION,
+    POLL_MIN_INTERVAL_SECONDS,
+    POLL_MAX_INTERVAL_SECONDS,
+    POLL_RATE_SMOOTHING,
+    TIMELINE_PAGE_SIZE,
+)
+from crawl import crawl_buffer
+from env import POLL_REQUESTS_PER_HOUR
+from features.sinks import SinkError, TweetSink, write_with_retry
+from logging_setup import logger
+
+CREATED_AT_FORMAT = "%a %b %d %H:%M:%S %z %Y"
+
+
+def parse_created_at(value: str):
+    """Convert a tweet ``created_at`` string to a unix timestamp (or None)."""
+    try:
+        return datetime.strptime(value, CREATED_AT_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def append_csv(keyword: str, rows: list):
+    """Default sink: append new rows to ``<keyword>_stream.csv``."""
+    file_path = Path(FOLDER_DESTINATION) / f"{keyword}_stream.csv"
+    file_path = Path(str(file_path).replace(" ", "_").replace(":", "-"))
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    write_header = not file_path.exists()
+    with open(file_path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FILTERED_FIELDS, extrasaction="ignore")
+        if write_header:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+class KeywordState:
+    """Arrival-rate and progress bookkeeping for a single polled keyword.
+
+    Every tweet up to ``last_id`` has been delivered. When a poll stops before
+    reaching ``last_id`` (batch full, or the crawl gave up), the tweets between
+    ``last_id`` and the oldest one fetched are still missing: ``gap_max_id``
+    marks that range and the keyword is polled again at once with ``max_id``
+    until the gap is closed.
+    """
+
+    def __init__(self, keyword: str, initial_rate: float):
+        self.keyword = keyword
+        self.rate = initial_rate  # tweets per second, smoothed
+        self.last_id = None
+        self.gap_max_id = None
+        self.pending_id = None  # newest id delivered while a gap is open
+        self.newest_ts = None
+        self.polls = 0
+
+    def query(self) -> str:
+        # since_id makes X return only tweets we have not seen yet, so every
+        # request is spent on fresh data.
+        query = self.keyword
+        if self.last_id is not None:
+            query += f" since_id:{self.last_id}"
+        if self.gap_max_id is not None:
+            query += f" max_id:{self.gap_max_id}"
+        return query
+
+    def wants(self, tweet_id: int) -> bool:
+        if self.last_id is not None and tweet_id <= self.last_id:
+            return False
+        return self.gap_max_id is None or tweet_id <= self.gap_max_id
+
+    def advance(self, ids: list, exhausted: bool):
+        """Move ``last_id`` forward after ``ids`` were delivered."""
+        if not ids and not exhausted:
+            # Nothing learned (failed or empty crawl); retry the same range.
+            return
+        newest = max(ids + [self.pending_id or 0, self.last_id or 0])
+        if exhausted or self.last_id is None:
+            # Reached tweets delivered earlier, or this is the first poll and
+            # there is no older boundary to backfill to.
+            self.last_id = newest or self.last_id
+            self.gap_max_id = self.pending_id = None
+            return
+        self.pending_id = newest
+        self.gap_max_id = min(ids) - 1
+        logger.warning(
+            "Poll for '%s' stopped before since_id %d; backfilling up to %d.",
+            self.keyword, self.last_id, self.gap_max_id,
+        )
+
+    def observe(self, rows: list, batch_size: int, now: float):
+        """Update the arrival rate from the ``created_at`` of new rows."""
+        stamps = sorted(ts for ts in (parse_created_at(r.get("created_at")) for r in rows) if ts)
+        sample = None
+        if len(stamps) >= batch_size and len(stamps) > 1:
+            # Batch was truncated: only the span it covers is trustworthy.
+            sample = (len(stamps) - 1) / max(stamps[-1] - stamps[0], 1.0)
+        elif self.newest_ts is not None:
+            sample = len(stamps) / max(now - self.newest_ts, 1.0)
+        elif len(stamps) > 1:
+            sample = (len(stamps) - 1) / max(stamps[-1] - stamps[0], 1.0)
+
+        if sample is not None:
+            self.rate = POLL_RATE_SMOOTHING * sample + (1 - POLL_RATE_SMOOTHING) * self.rate
+        if stamps:
+            self.newest_ts = max(stamps[-1], self.newest_ts or 0)
+        self.polls += 1
+
+
+class PollingDaemon:
+    """Poll several keywords on a schedule sized to their tweet velocity.
+
+    Each keyword is polled roughly when one ``batch_size`` worth of new tweets
+    is expected, clamped to ``[min_interval, max_interval]``. When the combined
+    schedule would exceed ``requests_per_hour`` every interval is stretched by
+    the same factor, so hot keywords keep their priority over quiet ones.
+
+    The budget counts timeline requests: a poll is expected to read one per
+    ``TIMELINE_PAGE_SIZE`` tweets, and the next poll is delayed by the
+    requests the previous one actually made. A poll stops as soon as the
+    timeline holds no unseen tweets, so a quiet keyword costs one request.
+
+    Parameters
+    ----------
+    access_token : str
+        Twitter access token.
+    keywords : list of str
+        Keywords to monitor.
+    batch_size : int, default ``20``
+        Maximum number of tweets fetched per poll.
+    requests_per_hour : int, optional
+        Global budget of timeline requests per hour. Defaults to
+        ``POLL_REQUESTS_PER_HOUR``.
+    on_tweets : callable, optional
+        ``on_tweets(keyword, rows)`` receives every batch of new tweets.
+        Defaults to appending them to a per-keyword CSV.
+    sink : TweetSink, optional
+        Write new tweets to this sink instead of calling ``on_tweets``.
+        A :class:`SinkError` stops the daemon.
+    filters : dict, optional
+        Tweet filters applied to every poll, see ``features.tweet_filters``.
+    download_media : bool, default ``False``
+        Download the media of polled tweets, see ``crawl``.
+    media_dir : str, optional
+        Where to store media. Defaults to ``./tweets-data/media``.
+    """
+
+    def __init__(
+        self,
+        *,
+        access_token: str,
+        keywords: list,
+        batch_size: int = 20,
+        requests_per_hour: int = None,
+        min_interval: float = POLL_MIN_INTERVAL_SECONDS,
+        max_interval: float = POLL_MAX_INTERVAL_SECONDS,
+        on_tweets=None,
+        filters: dict = None,
+        sink: TweetSink = None,
+        download_media: bool = False,
+        media_dir: str = None,
+    ):
+        if not keywords:
+            raise ValueError("At least one keyword is required")
+        self.access_token = access_token
+        self.batch_size = batch_size
+        self.requests_per_hour = requests_per_hour or POLL_REQUESTS_PER_HOUR
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        if sink and on_tweets:
+            raise ValueError("Pass either sink or on_tweets, not both")
+        self.sink = sink
+        self.on_tweets = on_tweets or append_csv
+        self.filters = filters
+        self.download_media = download_media
+        self.media_dir = media_dir
+        # Start every keyword at the slowest rate; the first poll corrects it.
+        initial_rate = batch_size / max_interval
+        self.states = {k: KeywordState(k, initial_rate) for k in dict.fromkeys(keywords)}
+        self._next_request = None
+
+    def pages(self, state: KeywordState, interval: float) -> int:
+        """Timeline requests a poll of ``state`` after ``interval`` is expected to make."""
+        expected = min(state.rate * interval, self.batch_size)
+        return max(math.ceil(expected / TIMELINE_PAGE_SIZE), 1)
+
+    def interval(self, state: KeywordState) -> float:
+        """Seconds until ``state`` should be polled again."""
+        if state.gap_max_id is not None:
+            return 0.0
+        intervals = {
+            k: min(max(self.batch_size / max(s.rate, 1e-9), self.min_interval), self.max_interval)
+            for k, s in self.states.items()
+        }
+        demand = sum(3600 / i * self.pages(self.states[k], i) for k, i in intervals.items())
+        scale = max(demand / self.requests_per_hour, 1.0)
+        return intervals[state.keyword] * scale
+
+    async def poll(self, state: KeywordState) -> list:
+        """Fetch tweets newer than the last stored one and hand them to the sink."""
+        spacing = 3600 / self.requests_per_hour
+        if self._next_request is not None:
+            wait = self._next_request - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        started = time.time()
+
+        backfill = state.gap_max_id is not None
+        stats = {}
+        try:
+            buffer = await crawl_buffer(
+                access_token=self.access_token,
+                search_keywords=state.query(),
+                target_tweet_count=self.batch_size,
+                search_tab="LATEST",
+                filters=self.filters,
+                stop_when_exhausted=True,
+                stop_at_id=state.last_id,
+                stats=stats,
+                download_media=self.download_media,
+                media_dir=self.media_dir,
+            )
+        finally:
+            # Charge the budget for every timeline request the poll made.
+            self._next_request = started + max(stats.get("responses", 0), 1) * spacing
+
+        rows = [
+            r for r in csv.DictReader(buffer)
+            if r.get("id_str", "").isdigit() and state.wants(int(r["id_str"]))
+        ]
+        # Hand rows over before advancing since_id, so a failed write does
+        # not skip them on the next poll.
+        if rows:
+            if self.sink:
+                await write_with_retry(self.sink, rows)
+            else:
+                self.on_tweets(state.keyword, rows)
+        state.advance([int(r["id_str"]) for r in rows], stats.get("exhausted", False))
+
+        # Backfilled tweets are old, they say nothing about the current rate.
+        if not backfill:
+            state.observe(rows, self.batch_size, time.time())
+        logger.info(
+            "Polled '%s'%s: %d new tweets in %d requests, rate %.4f tweets/s.",
+            state.keyword, " (backfill)" if backfill else "", len(rows),
+            stats.get("responses", 0), state.rate,
+        )
+        return rows
+
+    async def run(self, max_polls: int = None):
+        """Poll forever (or ``max_polls`` times) in priority order."""
+        now = time.time()
+        queue = [(now, keyword) for keyword in self.states]
+        heapq.heapify(queue)
+        polls = 0
+        while queue and (max_polls is None or polls < max_polls):
+            due, keyword = heapq.heappop(queue)
+            wait = due - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            state = self.states[keyword]
+            try:
+                await self.poll(state)
+            except SinkError:
+                raise
+            except Exception as e:
+                logger.error(f"Error polling '{keyword}': {e}")
+            polls += 1
+            next_in = self.interval(state)
+            logger.info("Next poll for '%s' in %d seconds.", keyword, next_in)
+            heapq.heappush(queue, (time.time() + next_in, keyword))
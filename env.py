@@ -6,3 +6,4 @@ load_dotenv()
 ACCESS_TOKEN = os.getenv("DEV_ACCESS_TOKEN")
 HEADLESS_MODE = os.getenv("HEADLESS_MODE", "true").lower() == "true"
 ENABLE_EXPONENTIAL_BACKOFF = os.getenv("ENABLE_EXPONENTIAL_BACKOFF", "false").lower() == "true"
+POLL_REQUESTS_PER_HOUR = int(os.getenv("POLL_REQUESTS_PER_HOUR", "60"))
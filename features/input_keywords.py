@@ -1,6 +1,8 @@
 from playwright.async_api import Page
 
-async def input_keywords(page: Page, *, search_keywords: str = "", from_date: str = None, to_date: str = None):
+from features.tweet_filters import build_query_filters
+
+async def input_keywords(page: Page, *, search_keywords: str = "", from_date: str = None, to_date: str = None, filters: dict = None):
     await page.wait_for_selector('input[name="allOfTheseWords"]', state='visible')
     await page.click('input[name="allOfTheseWords"]')
 
@@ -12,6 +14,9 @@ async def input_keywords(page: Page, *, search_keywords: str = "", from_date: st
     if to_date:
         day, month, year = to_date.split(" ")[0].split("-")
         modified_keywords += f" until:{year}-{month}-{day}"
+    query_filters = build_query_filters(filters)
+    if query_filters:
+        modified_keywords += f" {query_filters}"
 
     await page.fill('input[name="allOfTheseWords"]', modified_keywords)
     await page.press('input[name="allOfTheseWords"]', "Enter")
@@ -0,0 +1,156 @@
+import asyncio
+import csv
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from urllib.parse import urlparse
+
+from playwright.async_api import APIRequestContext
+
+from logging_setup import logger
+
+MANIFEST_FIELDS = ["id_str", "media_key", "type", "url", "sha256", "path"]
+
+
+def extract_media(legacy: dict) -> list:
+    """Return every photo and the best video variant attached to a tweet."""
+    media = (legacy.get("extended_entities") or legacy.get("entities") or {}).get("media", [])
+    found = []
+    for m in media:
+        media_type = m.get("type", "photo")
+        if media_type == "photo":
+            url = m.get("media_url_https")
+            if url:
+                url = f"{url}?name=orig"
+        else:
+            variants = [
+                v for v in m.get("video_info", {}).get("variants", [])
+                if v.get("content_type") == "video/mp4"
+            ]
+            best = max(variants, key=lambda v: v.get("bitrate", 0), default={})
+            url = best.get("url")
+        if url:
+            found.append({"media_key": m.get("media_key", ""), "type": media_type, "url": url})
+    return found
+
+
+class MediaDownloader:
+    """Download tweet media in the background, stored by content hash.
+
+    Files land in ``<media_dir>/<sha[:2]>/<sha>`` so identical media is
+    stored once however many tweets or URLs reference it. ``manifest.csv``
+    in ``media_dir`` maps each ``id_str`` to the files it references, along
+    with the media type.
+
+    ``submit`` never blocks, so the timeline crawl is not slowed down; call
+    ``close`` to wait for the queue to drain and write the manifest.
+    """
+
+    def __init__(
+        self,
+        request_context: APIRequestContext,
+        media_dir: str,
+        *,
+        workers: int = 16,
+        per_host: int = 4,
+        retries: int = 3,
+    ):
+        self.request_context = request_context
+        self.media_dir = Path(media_dir)
+        self.media_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.per_host = per_host
+        self.retries = retries
+        self.queue = asyncio.Queue()
+        self.manifest = []
+        self._host_limits = {}
+        self._downloads = {}
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, id_str: str, legacy: dict):
+        for media in extract_media(legacy):
+            self.queue.put_nowait((id_str, media))
+
+    async def close(self):
+        await self.queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.request_context.dispose()
+        self._write_manifest()
+
+    async def _worker(self):
+        while True:
+            id_str, media = await self.queue.get()
+            try:
+                url = media["url"]
+                # Same URL from several tweets: download once, share the result.
+                if url not in self._downloads:
+                    self._downloads[url] = asyncio.ensure_future(self._download(url))
+                stored = await self._downloads[url]
+                if stored:
+                    self.manifest.append({"id_str": id_str, **media, **stored})
+            except Exception as e:
+                logger.error(f"Media download failed for {media.get('url')}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _download(self, url: str):
+        host = urlparse(url).netloc
+        limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.per_host))
+        for attempt in range(self.retries + 1):
+            async with limit:
+                try:
+                    response = await self.request_context.get(url, timeout=60_000)
+                    if response.ok:
+                        body = await response.body()
+                        # Hashing and writing multi-MB videos would stall the
+                        # crawl sharing this event loop.
+                        return await asyncio.to_thread(self._store, body)
+                    status = response.status
+                except Exception as e:
+                    status = str(e)
+            if isinstance(status, int) and status < 500 and status != 429:
+                logger.warning("Media %s returned %s, skipping.", url, status)
+                return None
+            if attempt == self.retries:
+                break
+            logger.warning("Media %s failed (%s), retry %d/%d.", url, status, attempt + 1, self.retries)
+            await asyncio.sleep(2 ** attempt)
+        logger.warning("Media %s failed after %d retries, skipping.", url, self.retries)
+        return None
+
+    def _store(self, body: bytes) -> dict:
+        sha = hashlib.sha256(body).hexdigest()
+        # Keyed on the hash alone: the same bytes behind URLs with different
+        # suffixes must still land on one file.
+        path = self.media_dir / sha[:2] / sha
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write beside the target and rename, so the content-addressed
+            # path never holds a partial file.
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return {"sha256": sha, "path": str(path)}
+
+    def _write_manifest(self):
+        if not self.manifest:
+            return
+        manifest_path = self.media_dir / "manifest.csv"
+        write_header = not manifest_path.exists()
+        with open(manifest_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS, extrasaction="ignore")
+            if write_header:
+                writer.writeheader()
+            writer.writerows(self.manifest)
+        logger.info("Saved %d media entries to %s", len(self.manifest), manifest_path)
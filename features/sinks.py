@@ -0,0 +1,153 @@
+import asyncio
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+
+from constants import FILTERED_FIELDS
+from logging_setup import logger
+
+INTEGER_FIELDS = {"quote_count", "reply_count", "retweet_count", "favorite_count"}
+TABLE_NAME_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def check_table_name(table: str) -> str:
+    # The name is interpolated into SQL, so only plain identifiers are allowed.
+    if not TABLE_NAME_PATTERN.match(table or ""):
+        raise ValueError(f"Invalid table name: {table!r}")
+    return table
+
+
+class SinkError(Exception):
+    """A page of tweets could not be written to the sink."""
+
+
+class TweetSink(ABC):
+    """Receives crawled rows one page at a time."""
+
+    @abstractmethod
+    def write(self, rows: list):
+        ...
+
+    def close(self):
+        pass
+
+
+async def write_with_retry(sink: TweetSink, rows: list, retries: int = 2):
+    """Write ``rows`` to ``sink``, raising :class:`SinkError` once retries run out.
+
+    The write runs in a worker thread so database round trips do not stall
+    the page handlers and media downloads sharing the event loop.
+    """
+    for attempt in range(retries + 1):
+        try:
+            await asyncio.to_thread(sink.write, rows)
+            return
+        except Exception as e:
+            if attempt == retries:
+                raise SinkError(f"Failed to write {len(rows)} tweets to sink: {e}") from e
+            logger.warning("Sink write failed (%s), retry %d/%d.", e, attempt + 1, retries)
+            await asyncio.sleep(2 ** attempt)
+
+
+class DBAPISink(TweetSink):
+    """Upsert rows on ``id_str`` through any DB-API 2.0 connection.
+
+    Each ``write`` sends the page as multi-row ``INSERT ... VALUES (...), (...)``
+    statements in one transaction (one round trip per ``rows_per_statement``
+    rows, also on drivers like psycopg2 whose ``executemany`` loops per row).
+    Re-crawled tweets overwrite the stored row so engagement counts stay
+    current. The SQL uses ``ON CONFLICT ... DO UPDATE``, which PostgreSQL and
+    SQLite both understand.
+
+    Parameters
+    ----------
+    connection
+        Open DB-API connection, e.g. from ``psycopg2.connect``.
+    table : str, default ``"tweets"``
+        Table to write to. Created if it does not exist. Must be a plain
+        identifier (letters, digits and underscores).
+    placeholder : str, default ``"%s"``
+        Parameter marker of the driver (``"?"`` for ``sqlite3``).
+    rows_per_statement : int, default ``500``
+        Maximum rows per ``INSERT``; keep ``rows * columns`` under the
+        driver's parameter limit.
+    """
+
+    def __init__(
+        self,
+        connection,
+        table: str = "tweets",
+        placeholder: str = "%s",
+        rows_per_statement: int = 500,
+    ):
+        self.connection = connection
+        self.table = check_table_name(table)
+        self.rows_per_statement = rows_per_statement
+        self.columns = list(FILTERED_FIELDS)
+        self._row_values = "(" + ", ".join([placeholder] * len(self.columns)) + ")"
+        self._create_table()
+
+    def _create_table(self):
+        definitions = ", ".join(
+            "id_str TEXT PRIMARY KEY" if c == "id_str"
+            else f"{c} {'INTEGER' if c in INTEGER_FIELDS else 'TEXT'}"
+            for c in self.columns
+        )
+        cursor = self.connection.cursor()
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({definitions})")
+        self.connection.commit()
+
+    def _upsert_sql(self, row_count: int) -> str:
+        columns = ", ".join(self.columns)
+        values = ", ".join([self._row_values] * row_count)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in self.columns if c != "id_str")
+        return (
+            f"INSERT INTO {self.table} ({columns}) VALUES {values} "
+            f"ON CONFLICT (id_str) DO UPDATE SET {updates}"
+        )
+
+    def _values(self, row: dict) -> list:
+        values = []
+        for c in self.columns:
+            value = row.get(c)
+            if value == "":
+                value = None
+            elif c in INTEGER_FIELDS and value is not None:
+                value = int(value)
+            values.append(value)
+        return values
+
+    def write(self, rows: list):
+        # Last occurrence wins when a page repeats a tweet; a single statement
+        # may not touch the same row twice.
+        latest = list({str(r["id_str"]): r for r in rows if r.get("id_str")}.values())
+        if not latest:
+            return
+        cursor = self.connection.cursor()
+        try:
+            for start in range(0, len(latest), self.rows_per_statement):
+                chunk = latest[start:start + self.rows_per_statement]
+                params = [value for row in chunk for value in self._values(row)]
+                cursor.execute(self._upsert_sql(len(chunk)), params)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        logger.info("Upserted %d tweets into %s.", len(latest), self.table)
+
+    def close(self):
+        self.connection.close()
+
+
+class SQLiteSink(DBAPISink):
+    """:class:`DBAPISink` backed by a local SQLite database file."""
+
+    def __init__(self, path: str, table: str = "tweets"):
+        # Stay under SQLite's historical limit of 999 bound parameters.
+        # Writes come from worker threads, but never two at once.
+        super().__init__(
+            sqlite3.connect(path, check_same_thread=False),
+            table=check_table_name(table),
+            placeholder="?",
+            rows_per_statement=999 // len(FILTERED_FIELDS),
+        )
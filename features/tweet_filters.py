@@ -0,0 +1,87 @@
+FILTER_KEYS = {
+    "lang",
+    "min_faves",
+    "min_retweets",
+    "min_replies",
+    "min_quotes",
+    "originals_only",
+    "has_media",
+    "predicate",
+}
+
+
+class FilterError(Exception):
+    """A user-supplied ``predicate`` raised while checking a tweet."""
+
+
+def validate_filters(filters: dict) -> dict:
+    filters = filters or {}
+    unknown = set(filters) - FILTER_KEYS
+    if unknown:
+        raise ValueError(f"Unknown tweet filters: {', '.join(sorted(unknown))}")
+    return filters
+
+
+def build_query_filters(filters: dict) -> str:
+    """Translate the filters X search understands into query operators."""
+    filters = validate_filters(filters)
+    operators = []
+    if filters.get("lang"):
+        operators.append(f"lang:{filters['lang']}")
+    for key in ("min_faves", "min_retweets", "min_replies"):
+        if filters.get(key):
+            operators.append(f"{key}:{int(filters[key])}")
+    if filters.get("originals_only"):
+        operators += ["-filter:replies", "-filter:nativeretweets"]
+    if filters.get("has_media"):
+        operators.append("filter:media")
+    return " ".join(operators)
+
+
+def compile_filters(filters: dict):
+    """Build a single ``predicate(legacy) -> bool`` from ``filters``.
+
+    Every filter is also checked locally, since thread crawls have no query
+    and search does not always honour its operators. An exception from a
+    user ``predicate`` is raised as :class:`FilterError`, so a broken
+    predicate stops the crawl instead of silently rejecting every tweet.
+    Returns ``None`` when there is nothing to check.
+    """
+    filters = validate_filters(filters)
+    checks = []
+    if filters.get("lang"):
+        lang = filters["lang"]
+        checks.append(lambda t: t.get("lang") == lang)
+    for key, field in (
+        ("min_faves", "favorite_count"),
+        ("min_retweets", "retweet_count"),
+        ("min_replies", "reply_count"),
+        ("min_quotes", "quote_count"),
+    ):
+        if filters.get(key):
+            minimum = int(filters[key])
+            checks.append(lambda t, field=field, minimum=minimum: (t.get(field) or 0) >= minimum)
+    if filters.get("originals_only"):
+        checks.append(
+            lambda t: not t.get("in_reply_to_status_id_str")
+            and "retweeted_status_result" not in t
+            and not t.get("full_text", "").startswith("RT @")
+        )
+    if filters.get("has_media"):
+        checks.append(lambda t: bool(t.get("entities", {}).get("media")))
+    predicate = filters.get("predicate")
+
+    if not checks and not predicate:
+        return None
+
+    def matches(legacy: dict) -> bool:
+        if not all(check(legacy) for check in checks):
+            return False
+        if predicate is None:
+            return True
+        try:
+            return bool(predicate(legacy))
+        except Exception as e:
+            raise FilterError(f"Filter predicate failed on tweet {legacy.get('id_str')}: {e!r}") from e
+
+    return matches
@@ -6,6 +6,7 @@ import pandas as pd
 
 from crawl import crawl_buffer
 from env import ACCESS_TOKEN
+from features.sinks import TweetSink
 
 
 class PyTweetHarvest:
@@ -35,6 +36,10 @@ class PyTweetHarvest:
         to_date: Optional[str] = None,
         limit: int = 10,
         tab: str = "LATEST",
+        download_media: bool = False,
+        media_dir: Optional[str] = None,
+        filters: Optional[dict] = None,
+        sink: Optional[TweetSink] = None,
     ) -> pd.DataFrame:
         """Fetch tweets and return them as a :class:`pandas.DataFrame`.
 
@@ -52,6 +57,21 @@ class PyTweetHarvest:
             Maximum number of tweets to fetch.
         tab : {"LATEST", "TOP"}, default ``"LATEST"``
             Tab to crawl when searching.
+        download_media : bool, default ``False``
+            Also download every photo and the best video variant of each
+            tweet in the background. Files are stored by content hash and
+            listed in ``manifest.csv`` keyed by ``id_str``.
+        media_dir : str, optional
+            Where to store media. Defaults to ``./tweets-data/media``.
+        filters : dict, optional
+            Only keep matching tweets; ``limit`` counts matches only. Keys:
+            ``lang``, ``min_faves``, ``min_retweets``, ``min_replies``,
+            ``min_quotes``, ``originals_only``, ``has_media`` and
+            ``predicate`` (a callable receiving the tweet's ``legacy``
+            dict; if it raises, the crawl stops with ``FilterError``). Filters X supports are also added to the search query.
+        sink : TweetSink, optional
+            Also upsert each page of tweets on ``id_str`` as it is crawled,
+            e.g. ``SQLiteSink("tweets.db")`` or ``DBAPISink(connection)``.
         """
 
         buffer = asyncio.run(
@@ -62,6 +82,10 @@ class PyTweetHarvest:
                 search_to_date=to_date,
                 target_tweet_count=limit,
                 search_tab=tab,
+                download_media=download_media,
+                media_dir=media_dir,
+                filters=filters,
+                sink=sink,
             )
         )
 
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Modules import each other as top-level names (``from crawl import ...``).
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,220 @@
+import asyncio
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import daemon as daemon_module
+from daemon import KeywordState, PollingDaemon, append_csv
+from features.sinks import SinkError, SQLiteSink, TweetSink
+
+BASE = datetime(2025, 6, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def tweet(seconds: int) -> dict:
+    created_at = (BASE + timedelta(seconds=seconds)).strftime("%a %b %d %H:%M:%S %z %Y")
+    return {"created_at": created_at}
+
+
+def make_daemon(keywords, **kwargs):
+    kwargs.setdefault("batch_size", 20)
+    kwargs.setdefault("requests_per_hour", 3_600_000)
+    kwargs.setdefault("min_interval", 60)
+    kwargs.setdefault("max_interval", 3600)
+    return PollingDaemon(access_token="token", keywords=keywords, **kwargs)
+
+
+def test_observe_truncated_batch_uses_batch_span():
+    state = KeywordState("kw", initial_rate=0.0)
+    state.observe([tweet(0), tweet(10), tweet(20)], batch_size=3, now=0)
+    # 2 gaps over 20 s -> 0.1 tweets/s, smoothed with the initial 0.
+    assert state.rate == pytest.approx(0.05)
+    assert state.newest_ts == (BASE + timedelta(seconds=20)).timestamp()
+    assert state.polls == 1
+
+
+def test_observe_partial_batch_uses_time_since_newest():
+    state = KeywordState("kw", initial_rate=0.0)
+    state.newest_ts = BASE.timestamp()
+    now = BASE.timestamp() + 100
+    state.observe([tweet(50), tweet(60)], batch_size=20, now=now)
+    assert state.rate == pytest.approx(0.5 * 2 / 100)
+    assert state.newest_ts == (BASE + timedelta(seconds=60)).timestamp()
+
+
+def test_observe_empty_poll_decays_rate():
+    state = KeywordState("kw", initial_rate=0.2)
+    state.newest_ts = BASE.timestamp()
+    state.observe([], batch_size=20, now=BASE.timestamp() + 1000)
+    assert state.rate == pytest.approx(0.1)
+    assert state.newest_ts == BASE.timestamp()
+
+
+def test_observe_without_history_keeps_rate():
+    state = KeywordState("kw", initial_rate=0.3)
+    state.observe([tweet(0), {"created_at": "garbage"}], batch_size=20, now=0)
+    assert state.rate == 0.3
+    assert state.newest_ts == BASE.timestamp()
+
+
+def test_interval_sized_by_rate_and_clamped():
+    daemon = make_daemon(["hot", "mid", "cold"])
+    daemon.states["hot"].rate = 10.0
+    daemon.states["mid"].rate = 20 / 300
+    daemon.states["cold"].rate = 0.0
+    assert daemon.interval(daemon.states["hot"]) == 60
+    assert daemon.interval(daemon.states["mid"]) == pytest.approx(300)
+    assert daemon.interval(daemon.states["cold"]) == 3600
+
+
+def test_interval_weighted_by_expected_pages():
+    daemon = make_daemon(["a", "b"], batch_size=100, requests_per_hour=300)
+    for state in daemon.states.values():
+        state.rate = 10.0
+    # A poll per minute reading 100 tweets is 5 requests: 600/h against 300/h.
+    assert daemon.pages(daemon.states["a"], 60) == 5
+    assert daemon.interval(daemon.states["a"]) == pytest.approx(120)
+
+
+def test_interval_is_immediate_while_backfilling():
+    daemon = make_daemon(["kw"])
+    daemon.states["kw"].gap_max_id = 10
+    assert daemon.interval(daemon.states["kw"]) == 0
+
+
+def test_interval_stretched_to_fit_budget():
+    daemon = make_daemon(["a", "b"], requests_per_hour=60)
+    for state in daemon.states.values():
+        state.rate = 10.0
+    # Both want a poll per minute (120/h) against a budget of 60/h.
+    assert daemon.interval(daemon.states["a"]) == pytest.approx(120)
+    assert daemon.interval(daemon.states["b"]) == pytest.approx(120)
+
+
+def test_sink_and_on_tweets_are_exclusive(tmp_path):
+    sink = SQLiteSink(str(tmp_path / "tweets.db"))
+    with pytest.raises(ValueError):
+        make_daemon(["kw"], sink=sink, on_tweets=lambda keyword, rows: None)
+    sink.close()
+
+
+class FakeCrawl:
+    """Stands in for ``crawl_buffer``, serving one canned poll per call."""
+
+    def __init__(self, *polls):
+        self.polls = list(polls)
+        self.calls = []
+
+    async def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        ids, exhausted, responses = self.polls.pop(0)
+        kwargs["stats"].update(responses=responses, exhausted=exhausted)
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=["id_str", "created_at", "full_text"])
+        writer.writeheader()
+        for i in ids:
+            writer.writerow({"id_str": str(i), "created_at": tweet(i)["created_at"], "full_text": "x"})
+        buffer.seek(0)
+        return buffer
+
+
+class FailingSink(TweetSink):
+    def write(self, rows):
+        raise RuntimeError("connection lost")
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    async def sleep(_):
+        pass
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+
+
+def test_poll_queries_since_id_and_drops_seen_rows(monkeypatch):
+    fake = FakeCrawl(([5, 4], True, 1), ([7, 6, 5, 3], True, 1))
+    monkeypatch.setattr(daemon_module, "crawl_buffer", fake)
+    delivered = []
+    daemon = make_daemon(["kw"], on_tweets=lambda keyword, rows: delivered.append(rows))
+    state = daemon.states["kw"]
+
+    asyncio.run(daemon.poll(state))
+    assert fake.calls[0]["search_keywords"] == "kw"
+    assert fake.calls[0]["stop_at_id"] is None
+    assert state.last_id == 5
+
+    rows = asyncio.run(daemon.poll(state))
+    assert fake.calls[1]["search_keywords"] == "kw since_id:5"
+    assert fake.calls[1]["stop_at_id"] == 5
+    assert [r["id_str"] for r in rows] == ["7", "6"]
+    assert [len(batch) for batch in delivered] == [2, 2]
+    assert state.last_id == 7
+
+
+def test_truncated_poll_backfills_gap(monkeypatch):
+    fake = FakeCrawl(([10, 9], False, 1), ([8, 7], True, 1))
+    monkeypatch.setattr(daemon_module, "crawl_buffer", fake)
+    daemon = make_daemon(["kw"], on_tweets=lambda keyword, rows: None)
+    state = daemon.states["kw"]
+    state.last_id = 5
+
+    asyncio.run(daemon.poll(state))
+    # 6..8 were never fetched: keep last_id, poll the gap right away.
+    assert state.last_id == 5
+    assert state.gap_max_id == 8
+    assert daemon.interval(state) == 0
+
+    asyncio.run(daemon.poll(state))
+    assert fake.calls[1]["search_keywords"] == "kw since_id:5 max_id:8"
+    assert state.last_id == 10
+    assert state.gap_max_id is None
+
+
+def test_poll_spaces_next_request_by_requests_used(monkeypatch):
+    monkeypatch.setattr(daemon_module, "crawl_buffer", FakeCrawl(([3, 2, 1], True, 3)))
+    daemon = make_daemon(["kw"], on_tweets=lambda keyword, rows: None, requests_per_hour=3600)
+    before = daemon_module.time.time()
+    asyncio.run(daemon.poll(daemon.states["kw"]))
+    assert daemon._next_request >= before + 3
+
+
+def test_last_id_not_advanced_when_sink_fails(monkeypatch, no_sleep):
+    monkeypatch.setattr(daemon_module, "crawl_buffer", FakeCrawl(([7, 6], True, 1)))
+    daemon = make_daemon(["kw"], sink=FailingSink())
+    state = daemon.states["kw"]
+    state.last_id = 5
+    with pytest.raises(SinkError):
+        asyncio.run(daemon.poll(state))
+    assert state.last_id == 5
+
+
+def test_run_stops_on_sink_error(monkeypatch, no_sleep):
+    fake = FakeCrawl(([2, 1], True, 1), ([4, 3], True, 1))
+    monkeypatch.setattr(daemon_module, "crawl_buffer", fake)
+    daemon = make_daemon(["a", "b"], sink=FailingSink())
+    with pytest.raises(SinkError):
+        asyncio.run(daemon.run(max_polls=2))
+    assert len(fake.calls) == 1
+
+
+def test_run_continues_after_crawl_error(monkeypatch, no_sleep):
+    calls = []
+
+    async def broken(**kwargs):
+        calls.append(kwargs)
+        raise RuntimeError("browser crashed")
+
+    monkeypatch.setattr(daemon_module, "crawl_buffer", broken)
+    daemon = make_daemon(["a", "b"], on_tweets=lambda keyword, rows: None)
+    asyncio.run(daemon.run(max_polls=2))
+    assert len(calls) == 2
+
+
+def test_append_csv_keeps_column_order(monkeypatch, tmp_path):
+    monkeypatch.setattr(daemon_module, "FOLDER_DESTINATION", str(tmp_path))
+    append_csv("kw", [{"id_str": "1", "full_text": "a"}])
+    append_csv("kw", [{"full_text": "b", "lang": "in", "id_str": "2"}])
+    with open(tmp_path / "kw_stream.csv", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["id_str"], r["full_text"], r["lang"]) for r in rows] == [("1", "a", ""), ("2", "b", "in")]
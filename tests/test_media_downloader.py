@@ -0,0 +1,174 @@
+import asyncio
+import csv
+
+import pytest
+
+from features.media_downloader import MediaDownloader, extract_media
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: bytes = b""):
+        self.status = status
+        self.ok = 200 <= status < 300
+        self._body = body
+
+    async def body(self):
+        return self._body
+
+
+class FakeRequestContext:
+    """Serves canned responses per URL, one per attempt."""
+
+    def __init__(self, responses: dict):
+        self.responses = {url: list(r) for url, r in responses.items()}
+        self.requests = []
+        self.disposed = False
+
+    async def get(self, url, timeout=None):
+        self.requests.append(url)
+        queue = self.responses[url]
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+    async def dispose(self):
+        self.disposed = True
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay):
+        await real_sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+
+
+def run_downloads(context, tmp_path, tweets, **kwargs):
+    async def main():
+        downloader = MediaDownloader(context, str(tmp_path), **kwargs)
+        downloader.start()
+        for id_str, legacy in tweets:
+            downloader.submit(id_str, legacy)
+        await downloader.close()
+        return downloader
+
+    return asyncio.run(main())
+
+
+def photo(url: str, key: str = "3_1") -> dict:
+    return {"extended_entities": {"media": [{"type": "photo", "media_key": key, "media_url_https": url}]}}
+
+
+def test_extract_media_prefers_extended_entities_and_orig_photos():
+    legacy = {
+        "entities": {"media": [{"type": "photo", "media_url_https": "https://pbs.twimg.com/media/first.jpg"}]},
+        "extended_entities": {
+            "media": [
+                {"type": "photo", "media_key": "3_1", "media_url_https": "https://pbs.twimg.com/media/a.jpg"},
+                {"type": "photo", "media_key": "3_2", "media_url_https": "https://pbs.twimg.com/media/b.png"},
+            ]
+        },
+    }
+    assert extract_media(legacy) == [
+        {"media_key": "3_1", "type": "photo", "url": "https://pbs.twimg.com/media/a.jpg?name=orig"},
+        {"media_key": "3_2", "type": "photo", "url": "https://pbs.twimg.com/media/b.png?name=orig"},
+    ]
+
+
+def test_extract_media_falls_back_to_entities():
+    legacy = {"entities": {"media": [{"type": "photo", "media_url_https": "https://pbs.twimg.com/media/a.jpg"}]}}
+    assert [m["url"] for m in extract_media(legacy)] == ["https://pbs.twimg.com/media/a.jpg?name=orig"]
+    assert extract_media({}) == []
+
+
+def test_extract_media_picks_best_mp4_variant():
+    legacy = {
+        "extended_entities": {
+            "media": [
+                {
+                    "type": "video",
+                    "media_key": "7_1",
+                    "video_info": {
+                        "variants": [
+                            {"content_type": "application/x-mpegURL", "url": "https://video.twimg.com/pl.m3u8"},
+                            {"content_type": "video/mp4", "bitrate": 832000, "url": "https://video.twimg.com/mid.mp4"},
+                            {"content_type": "video/mp4", "bitrate": 2176000, "url": "https://video.twimg.com/hi.mp4"},
+                            {"content_type": "video/mp4", "bitrate": 256000, "url": "https://video.twimg.com/lo.mp4"},
+                        ]
+                    },
+                },
+                {
+                    "type": "animated_gif",
+                    "media_key": "16_1",
+                    "video_info": {"variants": [{"content_type": "application/x-mpegURL", "url": "https://x/pl.m3u8"}]},
+                },
+            ]
+        }
+    }
+    assert extract_media(legacy) == [
+        {"media_key": "7_1", "type": "video", "url": "https://video.twimg.com/hi.mp4"},
+    ]
+
+
+def test_same_url_downloaded_once_and_same_bytes_stored_once(tmp_path):
+    url_a = "https://pbs.twimg.com/media/a.jpg"
+    url_b = "https://pbs.twimg.com/media/a.png"
+    context = FakeRequestContext({
+        f"{url_a}?name=orig": [FakeResponse(200, b"same bytes")],
+        f"{url_b}?name=orig": [FakeResponse(200, b"same bytes")],
+    })
+    downloader = run_downloads(
+        context, tmp_path, [("1", photo(url_a)), ("2", photo(url_a)), ("3", photo(url_b))]
+    )
+    assert sorted(context.requests) == [f"{url_a}?name=orig", f"{url_b}?name=orig"]
+    stored = [p for p in tmp_path.rglob("*") if p.is_file() and p.name != "manifest.csv"]
+    assert len(stored) == 1
+    assert {m["path"] for m in downloader.manifest} == {str(stored[0])}
+    assert context.disposed
+
+
+def test_client_error_skipped_without_retry(tmp_path, no_sleep):
+    url = "https://pbs.twimg.com/media/gone.jpg?name=orig"
+    context = FakeRequestContext({url: [FakeResponse(404)]})
+    downloader = run_downloads(context, tmp_path, [("1", photo("https://pbs.twimg.com/media/gone.jpg"))])
+    assert context.requests == [url]
+    assert downloader.manifest == []
+    assert not (tmp_path / "manifest.csv").exists()
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_server_errors_retried(tmp_path, no_sleep, status):
+    url = "https://pbs.twimg.com/media/a.jpg?name=orig"
+    context = FakeRequestContext({url: [FakeResponse(status), FakeResponse(status), FakeResponse(200, b"ok")]})
+    downloader = run_downloads(context, tmp_path, [("1", photo("https://pbs.twimg.com/media/a.jpg"))])
+    assert len(context.requests) == 3
+    assert len(downloader.manifest) == 1
+
+
+def test_retries_give_up_after_limit(tmp_path, no_sleep):
+    url = "https://pbs.twimg.com/media/a.jpg?name=orig"
+    context = FakeRequestContext({url: [FakeResponse(500)]})
+    downloader = run_downloads(context, tmp_path, [("1", photo("https://pbs.twimg.com/media/a.jpg"))], retries=2)
+    assert len(context.requests) == 3
+    assert downloader.manifest == []
+
+
+def test_manifest_joined_to_id_str(tmp_path):
+    url_a = "https://pbs.twimg.com/media/a.jpg"
+    url_b = "https://pbs.twimg.com/media/b.jpg"
+    context = FakeRequestContext({
+        f"{url_a}?name=orig": [FakeResponse(200, b"a")],
+        f"{url_b}?name=orig": [FakeResponse(200, b"b")],
+    })
+    run_downloads(context, tmp_path, [("10", photo(url_a, "3_10")), ("20", photo(url_b, "3_20"))])
+    with open(tmp_path / "manifest.csv", encoding="utf-8") as f:
+        rows = sorted(csv.DictReader(f), key=lambda r: r["id_str"])
+    assert [(r["id_str"], r["media_key"], r["type"], r["url"]) for r in rows] == [
+        ("10", "3_10", "photo", f"{url_a}?name=orig"),
+        ("20", "3_20", "photo", f"{url_b}?name=orig"),
+    ]
+    for row in rows:
+        with open(row["path"], "rb") as f:
+            assert len(row["sha256"]) == 64
+            assert row["path"].endswith(row["sha256"])
+            assert f.read() in (b"a", b"b")
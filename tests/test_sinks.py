@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from features.sinks import SinkError, SQLiteSink, TweetSink, write_with_retry
+
+
+def fetch(sink):
+    return sink.connection.execute(
+        "SELECT id_str, favorite_count, full_text FROM tweets ORDER BY CAST(id_str AS INTEGER)"
+    ).fetchall()
+
+
+def test_sqlite_sink_upserts_on_id_str(tmp_path):
+    sink = SQLiteSink(str(tmp_path / "tweets.db"))
+    sink.write([
+        {"id_str": "1", "favorite_count": 1, "full_text": "a"},
+        {"id_str": "2", "favorite_count": "", "full_text": "b"},
+    ])
+    sink.write([{"id_str": "1", "favorite_count": "9", "full_text": "a2"}])
+    assert fetch(sink) == [("1", 9, "a2"), ("2", None, "b")]
+    sink.close()
+
+
+def test_sqlite_sink_dedups_page_and_spans_statements(tmp_path):
+    sink = SQLiteSink(str(tmp_path / "tweets.db"))
+    rows = [{"id_str": str(i), "favorite_count": i, "full_text": "x"} for i in range(200)]
+    rows.append({"id_str": "0", "favorite_count": 5, "full_text": "latest"})
+    sink.write(rows)
+    stored = fetch(sink)
+    assert len(stored) == 200
+    assert stored[0] == ("0", 5, "latest")
+    sink.close()
+
+
+@pytest.mark.parametrize("table", ["my-tweets", "t; DROP TABLE x", "1tweets", ""])
+def test_invalid_table_name_rejected(tmp_path, table):
+    with pytest.raises(ValueError, match="Invalid table name"):
+        SQLiteSink(str(tmp_path / "tweets.db"), table=table)
+
+
+def test_tweet_sink_requires_write():
+    class Incomplete(TweetSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_write_with_retry_writes_sqlite_from_worker_thread(tmp_path):
+    sink = SQLiteSink(str(tmp_path / "tweets.db"))
+    asyncio.run(write_with_retry(sink, [{"id_str": "1", "favorite_count": 3, "full_text": "a"}]))
+    assert fetch(sink) == [("1", 3, "a")]
+    sink.close()
+
+
+def test_write_with_retry_raises_sink_error(monkeypatch):
+    class Failing(TweetSink):
+        calls = 0
+
+        def write(self, rows):
+            Failing.calls += 1
+            raise RuntimeError("database is locked")
+
+    async def no_sleep(_):
+        pass
+
+    monkeypatch.setattr(asyncio, "sleep", no_sleep)
+    with pytest.raises(SinkError, match="database is locked"):
+        asyncio.run(write_with_retry(Failing(), [{"id_str": "1"}], retries=2))
+    assert Failing.calls == 3
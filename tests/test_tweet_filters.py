@@ -0,0 +1,78 @@
+import pytest
+
+from features.tweet_filters import FilterError, build_query_filters, compile_filters
+
+
+def test_build_query_filters_translates_supported_operators():
+    query = build_query_filters(
+        {
+            "lang": "in",
+            "min_faves": 10,
+            "min_retweets": "2",
+            "min_replies": 3,
+            "originals_only": True,
+            "has_media": True,
+            "min_quotes": 5,
+            "predicate": lambda t: True,
+        }
+    )
+    assert query == (
+        "lang:in min_faves:10 min_retweets:2 min_replies:3 "
+        "-filter:replies -filter:nativeretweets filter:media"
+    )
+
+
+def test_build_query_filters_empty():
+    assert build_query_filters(None) == ""
+    assert build_query_filters({"lang": None, "has_media": False}) == ""
+
+
+def test_unknown_filter_rejected():
+    with pytest.raises(ValueError, match="min_likes"):
+        build_query_filters({"min_likes": 1})
+    with pytest.raises(ValueError):
+        compile_filters({"min_likes": 1})
+
+
+def test_compile_filters_none_when_empty():
+    assert compile_filters(None) is None
+    assert compile_filters({}) is None
+
+
+def test_compile_filters_checks_every_field():
+    matches = compile_filters(
+        {"lang": "in", "min_faves": 5, "min_quotes": 1, "originals_only": True, "has_media": True}
+    )
+    tweet = {
+        "lang": "in",
+        "favorite_count": 5,
+        "quote_count": 1,
+        "full_text": "halo",
+        "entities": {"media": [{"type": "photo"}]},
+    }
+    assert matches(tweet)
+    assert not matches({**tweet, "lang": "en"})
+    assert not matches({**tweet, "favorite_count": 4})
+    assert not matches({**tweet, "quote_count": 0})
+    assert not matches({**tweet, "in_reply_to_status_id_str": "123"})
+    assert not matches({**tweet, "full_text": "RT @someone: halo"})
+    assert not matches({**tweet, "retweeted_status_result": {}})
+    assert not matches({**tweet, "entities": {}})
+
+
+def test_compile_filters_raises_when_predicate_raises():
+    matches = compile_filters({"predicate": lambda t: t["favourite_count"] > 1})
+    with pytest.raises(FilterError, match="tweet 1.*favourite_count"):
+        matches({"id_str": "1", "favorite_count": 2})
+
+
+def test_compile_filters_predicate_after_builtin_checks():
+    seen = []
+    matches = compile_filters({"lang": "in", "predicate": lambda t: seen.append(t["id_str"]) or True})
+    assert not matches({"id_str": "1", "lang": "en"})
+    assert matches({"id_str": "2", "lang": "in"})
+    assert seen == ["2"]
+
+    matches = compile_filters({"predicate": lambda t: t["full_text"].startswith("a")})
+    assert matches({"full_text": "abc"})
+    assert not matches({"full_text": "xyz"})